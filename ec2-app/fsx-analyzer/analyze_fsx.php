@@ -1,9 +1,9 @@
 <?php
 require '/path/to/aws/vendor/autoload.php';
 
-use Aws\Fsx\FsxClient;
-use Aws\CloudWatch\CloudWatchClient;
+use Aws\Sdk;
 use Aws\Exception\AwsException;
+use GuzzleHttp\Promise\Each;
 
 // Enable error reporting
 error_reporting(E_ALL);
@@ -14,88 +14,108 @@ header('Access-Control-Allow-Origin: *');
 header('Content-Type: application/json');
 
 try {
-    // Initialize AWS clients
-    $fsx = new FsxClient([
+    // Shared configuration for all AWS clients
+    $sdk = new Sdk([
         'version' => 'latest',
         'region'  => 'us-east-1',
         'credentials' => [
             'key'    => 'YOUR_ACCESS_KEY',
             'secret' => 'YOUR_SECRET_KEY'
+        ],
+        'retries' => [
+            'mode' => 'adaptive',
+            'max_attempts' => 10
+        ],
+        'http' => [
+            'curl' => [
+                CURLOPT_TCP_KEEPALIVE => 1
+            ]
         ]
     ]);
 
-    $cloudwatch = new CloudWatchClient([
-        'version' => 'latest',
-        'region'  => 'us-east-1',
-        'credentials' => [
-            'key'    => 'YOUR_ACCESS_KEY',
-            'secret' => 'YOUR_SECRET_KEY'
-        ]
-    ]);
+    // Initialize AWS clients (create others, e.g. $sdk->createCloudWatch(), only when used)
+    $fsx = $sdk->createFsx();
 
-    // Get FSx systems
-    $result = $fsx->describeFileSystems([]);
-    $filesystems = $result['FileSystems'];
-    
-    $response = [];
+    // Get ONTAP FSx systems, discarding other filesystem types page by page
+    $filesystems = iterator_to_array(
+        $fsx->getPaginator('DescribeFileSystems')
+            ->search('FileSystems[?FileSystemType == `ONTAP`]'),
+        false
+    );
     
-    foreach ($filesystems as $fs) {
-        if ($fs['FileSystemType'] === 'ONTAP') {
-            // Get volumes
-            $volumes = $fsx->describeVolumes([
+    // Fetch every page of volumes for each ONTAP filesystem concurrently,
+    // capping in-flight requests so large accounts stay under FSx throttling
+    $max_concurrent_requests = 10;
+    $volumes_by_fs = [];
+    $volume_requests = function () use ($fsx, $filesystems, &$volumes_by_fs) {
+        foreach ($filesystems as $fs) {
+            $fsid = $fs['FileSystemId'];
+            $volumes_by_fs[$fsid] = [];
+            yield $fsx->getPaginator('DescribeVolumes', [
                 'Filters' => [
                     [
                         'Name' => 'file-system-id',
-                        'Values' => [$fs['FileSystemId']]
+                        'Values' => [$fsid]
                     ]
                 ]
-            ])['Volumes'];
-            
-            // Analyze volumes and collect metrics
-            $total_volume_size = 0;
-            $analyzed_volumes = [];
-            
-            foreach ($volumes as $vol) {
-                $size_mb = $vol['OntapConfiguration']['SizeInMegabytes'];
-                $size_gib = $size_mb / 1024;
-                $total_volume_size += $size_gib;
-                
-                $analyzed_volumes[] = [
-                    'id' => $vol['VolumeId'],
-                    'size_gib' => $size_gib,
-                    'read_throughput_mbs' => 0, // Add CloudWatch metrics if needed
-                    'write_throughput_mbs' => 0
-                ];
-            }
-            
-            $slack = $fs['StorageCapacity'] - $total_volume_size;
-            $slack_pct = ($slack / $fs['StorageCapacity']) * 100;
-            
-            // Generate recommendations
-            $recommendations = [];
-            if ($slack_pct > 80) {
-                $recommendations[] = [
-                    'type' => 'warning',
-                    'message' => "High unused space ($slack_pct%). Consider reducing filesystem size."
-                ];
-            } elseif ($slack_pct < 5) {
-                $recommendations[] = [
-                    'type' => 'critical',
-                    'message' => "Low free space ($slack_pct%). Consider increasing filesystem size."
-                ];
-            }
+            ])->each(function ($result) use (&$volumes_by_fs, $fsid) {
+                foreach ($result['Volumes'] as $vol) {
+                    $volumes_by_fs[$fsid][] = $vol;
+                }
+            });
+        }
+    };
+    Each::ofLimitAll($volume_requests(), $max_concurrent_requests)->wait();
+    
+    $response = [];
+    
+    foreach ($filesystems as $fs) {
+        $volumes = $volumes_by_fs[$fs['FileSystemId']];
+        
+        // Analyze volumes and collect metrics
+        $total_volume_size = 0;
+        $analyzed_volumes = [];
+        
+        foreach ($volumes as $vol) {
+            $size_mb = $vol['OntapConfiguration']['SizeInMegabytes'];
+            $size_gib = $size_mb / 1024;
+            $total_volume_size += $size_gib;
             
-            $response[] = [
-                'fsid' => $fs['FileSystemId'],
-                'storage' => $fs['StorageCapacity'],
-                'throughput' => $fs['OntapConfiguration']['ThroughputCapacity'],
-                'total_volume_size' => $total_volume_size,
-                'slack_space' => $slack,
-                'slack_percentage' => $slack_pct,
-                'volumes' => $analyzed_volumes,
-                'recommendations' => $recommendations
+            $analyzed_volumes[] = [
+                'id' => $vol['VolumeId'],
+                'size_gib' => $size_gib,
+                'read_throughput_mbs' => 0, // Add CloudWatch metrics if needed
+                'write_throughput_mbs' => 0
+            ];
+        }
+        
+        $slack = $fs['StorageCapacity'] - $total_volume_size;
+        $slack_pct = ($slack / $fs['StorageCapacity']) * 100;
+        
+        // Generate recommendations
+        $recommendations = [];
+        if ($slack_pct > 80) {
+            $recommendations[] = [
+                'type' => 'warning',
+                'message' => "High unused space ($slack_pct%). Consider reducing filesystem size."
+            ];
+        } elseif ($slack_pct < 5) {
+            $recommendations[] = [
+                'type' => 'critical',
+                'message' => "Low free space ($slack_pct%). Consider increasing filesystem size."
             ];
         }
+        
+        $response[] = [
+            'fsid' => $fs['FileSystemId'],
+            'storage' => $fs['StorageCapacity'],
+            'throughput' => $fs['OntapConfiguration']['ThroughputCapacity'],
+            'total_volume_size' => $total_volume_size,
+            'slack_space' => $slack,
+            'slack_percentage' => $slack_pct,
+            'volumes' => $analyzed_volumes,
+            'recommendations' => $recommendations
+        ];
     }
     
     echo json_encode($response);